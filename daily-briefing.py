@@ -3,16 +3,46 @@
 from dotenv import load_dotenv
 import os
 load_dotenv()
+import sys
 import smtplib
+import socket
+import ssl
 import logging
 import json
-import time
-from openai import OpenAI
-from datetime import datetime
+import atexit
+import threading
+import functools
+from datetime import date, datetime
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from zoneinfo import ZoneInfo
-from typing import Dict, Any, List
-from email.mime.text import MIMEText
-from jinja2 import Environment, FileSystemLoader
+from typing import TYPE_CHECKING, Dict, Any, List, Optional
+from email.message import EmailMessage
+from markupsafe import Markup
+from tenacity import (
+    RetryCallState, RetryError, retry, retry_if_exception, stop_after_attempt, wait_random_exponential,
+)
+
+# openai and jinja2 are slow to import, so they are loaded on first use
+# (see _openai_client() and _template()) rather than at start-up.
+if TYPE_CHECKING:
+    import httpx
+    from jinja2 import Template
+    from openai import OpenAI
+
+# orjson is an optional, faster drop-in; both paths emit the same compact UTF-8 JSON.
+try:
+    import orjson
+
+    def json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+    json_loads = orjson.loads
+except ImportError:
+    def json_dumps(obj: Any) -> str:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+    json_loads = json.loads
 
 # ---------------------------
 # 1) Configuration
@@ -31,6 +61,19 @@ EMAIL_TO = os.getenv("EMAIL_TO", EMAIL_USER)
 SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
 SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
 
+# When set, live prices are fetched from Finnhub and handed to the model so it
+# only has to provide the analysis.
+FINNHUB_API_KEY = os.getenv("FINNHUB_API_KEY")
+
+# Submit the completion through the Batch API (cheaper, up to 24h turnaround)
+# instead of waiting on it synchronously. See submit_job() / finalize_job().
+USE_BATCH = os.getenv("USE_BATCH", "0") == "1"
+BATCH_STATE_FILE = os.getenv("BATCH_STATE_FILE", "pending_batch.json")
+
+# A marker file per day is written after a successful send so repeated
+# scheduler firings on the same day don't redo the work.
+SENTINEL_DIR = Path(os.getenv("SENTINEL_DIR", "/var/tmp"))
+
 # Configuration values for the briefing
 WATCHLIST_UNIVERSE = ["MSFT", "NVDA", "ETN", "LLY", "NOC", "MA", "ANET", "CRWD"]
 OPEN_POSITIONS = {
@@ -68,31 +111,34 @@ GMAIL_APP_PASSWORD = _require_env("GMAIL_APP_PASSWORD", GMAIL_APP_PASSWORD)
 # 4) Prompt
 # ---------------------------
 
-def build_prompt(now_pht: datetime) -> str:
-    """Builds the market analyst prompt in a structured JSON format."""
-    date_str = now_pht.strftime("%A, %B %d, %Y")
-
-    watchlist_items = [
-        {"ticker": ticker, "rsi": "number", "macd": "bullish|bearish|neutral", "rank": "string", "action": "string"}
-        for ticker in WATCHLIST_UNIVERSE
-    ]
-    open_positions_items = [
-        {"ticker": ticker, "entry_price": entry_price, "current_price": "find current price (number)"}
-        for ticker, entry_price in OPEN_POSITIONS.items()
-    ]
-
-    return f"""
-You are a market analyst. Return ONLY valid JSON, no prose, matching this schema exactly:
-
-{{
-  "date": "{date_str}",
+# The prompt only varies by date, so everything derived from the module
+# constants is rendered once here and build_prompt() just splices the date in.
+_WATCHLIST_JSON = json_dumps([
+    {"ticker": ticker, "rsi": "number", "macd": "bullish|bearish|neutral", "rank": "string", "action": "string"}
+    for ticker in WATCHLIST_UNIVERSE
+])
+_OPEN_POS_JSON = json_dumps([
+    {"ticker": ticker, "entry_price": entry_price, "current_price": "find current price (number)"}
+    for ticker, entry_price in OPEN_POSITIONS.items()
+])
+_TICKERS_CSV = ", ".join(WATCHLIST_UNIVERSE)
+_REMINDER = f"Max risk per trade: {RISK_LOWER:.1f}%–{RISK_UPPER:.1f}%"
+
+_PROMPT_HEAD = (
+    "You are a market analyst. Return ONLY valid JSON, no prose, matching this schema exactly:\n"
+    "\n"
+    "{\n"
+    '  "date": "'
+)
+
+_PROMPT_TAIL = f"""",
   "market_overview": {{
     "sentiment": "string",
     "indexes": {{"sp500": "string", "nasdaq": "string"}},
     "news": ["string", "string"]
   }},
-  "watchlist": {json.dumps(watchlist_items)},
-  "open_positions": {json.dumps(open_positions_items)},
+  "watchlist": {_WATCHLIST_JSON},
+  "open_positions": {_OPEN_POS_JSON},
   "journal": {{
     "did_right": ["string"],
     "improve": ["string"],
@@ -106,39 +152,144 @@ You are a market analyst. Return ONLY valid JSON, no prose, matching this schema
     }}
   ],
   "reminders": [
-    "Max risk per trade: {RISK_LOWER:.1f}%–{RISK_UPPER:.1f}%",
+    "{_REMINDER}",
     "Stop-loss discipline check",
     "Emotional check-in & predicted mood"
   ]
 }}
 
 Guidance:
-- Watchlist universe: {', '.join(WATCHLIST_UNIVERSE)}.
+- Watchlist universe: {_TICKERS_CSV}.
 - For `open_positions`, find the latest price for the given tickers.
 - For `opportunities`, identify new trade setups from the watchlist universe.
 - Be concise and realistic with indicators.
 - Use USD numbers for entries and prices.
 - Do not include any text outside JSON.
-""".strip()
+""".rstrip()
+
+DATE_LONG_FMT = "%A, %B %d, %Y"   # In the prompt, e.g. "Sunday, August 10, 2025"
+DATE_SHORT_FMT = "%B %d, %Y"      # In the subject, e.g. "August 10, 2025"
+
+def build_prompt(date_str: str, quotes: Optional[Dict[str, float]] = None) -> str:
+    """Builds the market analyst prompt in a structured JSON format."""
+    prompt = _PROMPT_HEAD + date_str + _PROMPT_TAIL
+    if quotes:
+        prompt += f"\n- Latest prices in USD, use these instead of looking prices up: {json_dumps(quotes)}"
+    return prompt
 
 # ---------------------------
 # 5) Core actions
 # ---------------------------
 
+# One client per process so its HTTP connection pool (and the TLS session to
+# api.openai.com) is shared by every call instead of rebuilt each time.
+# HTTP/2 (when the optional h2 package is installed) multiplexes requests over
+# that connection and compresses repeated headers.
+@functools.cache
+def _openai_client() -> "OpenAI":
+    import httpx
+    from openai import DEFAULT_CONNECTION_LIMITS, DefaultHttpxClient, OpenAI
+
+    # Keep the SDK's pool sizes; only hold idle connections open longer.
+    limits = httpx.Limits(
+        max_connections=DEFAULT_CONNECTION_LIMITS.max_connections,
+        max_keepalive_connections=DEFAULT_CONNECTION_LIMITS.max_keepalive_connections,
+        keepalive_expiry=60,
+    )
+    try:
+        http_client = DefaultHttpxClient(http2=True, limits=limits)
+    except ImportError:
+        http_client = DefaultHttpxClient(limits=limits)
+    return OpenAI(api_key=OPENAI_API_KEY, timeout=30, http_client=http_client)
+
+def _completion_request(prompt: str) -> Dict[str, Any]:
+    """Chat Completions request body, shared by the live and batch paths."""
+    return {
+        "model": "gpt-4o",  # Use a valid and available model, like gpt-4o or gpt-3.5-turbo
+        "messages": [
+            {"role": "system", "content": "You are a helpful assistant that provides a market briefing."},
+            {"role": "user", "content": prompt}
+        ],
+        "response_format": {"type": "json_object"},
+    }
+
+QUOTE_URL = "https://finnhub.io/api/v1/quote"
+QUOTE_CONCURRENCY = 5
+QUOTE_TICKERS = list(dict.fromkeys([*WATCHLIST_UNIVERSE, *OPEN_POSITIONS]))
+
+def _fetch_quote(client: "httpx.Client", ticker: str, errors: tuple) -> Optional[float]:
+    """Returns the last traded price for ticker, or None if it can't be fetched."""
+    try:
+        response = client.get(QUOTE_URL, params={"symbol": ticker})
+        response.raise_for_status()
+        body = response.json()
+        if not isinstance(body, dict):
+            raise ValueError(f"unexpected response body {body!r}")
+        # Finnhub answers unknown symbols with a zero price rather than an error.
+        return float(body["c"]) if body.get("c") else None
+    except errors as e:
+        logger.warning(f"Quote fetch failed for {ticker}: {e}")
+        return None
+
+def fetch_quotes(tickers: List[str]) -> Dict[str, float]:
+    """Fetches prices for all tickers at once, at most QUOTE_CONCURRENCY in flight.
+
+    Returns an empty dict when FINNHUB_API_KEY isn't set; tickers that fail
+    are left out and the model is asked to find those prices itself.
+    """
+    if not FINNHUB_API_KEY:
+        return {}
+    import httpx
+
+    errors = (httpx.HTTPError, ValueError, TypeError)
+    logger.info(f"Fetching quotes for {len(tickers)} tickers…")
+    # The key goes in a header, not the query string, so it never appears in
+    # httpx's request log lines or in HTTPStatusError messages.
+    with httpx.Client(timeout=10, headers={"X-Finnhub-Token": FINNHUB_API_KEY}) as client, \
+            ThreadPoolExecutor(max_workers=QUOTE_CONCURRENCY) as pool:
+        prices = pool.map(lambda ticker: _fetch_quote(client, ticker, errors), tickers)
+        return {ticker: price for ticker, price in zip(tickers, prices) if price is not None}
+
+# Top-level sections the template relies on, and the JSON type of each.
+BRIEFING_SCHEMA = {
+    "date": str,
+    "market_overview": dict,
+    "watchlist": list,
+    "open_positions": list,
+    "journal": dict,
+    "opportunities": list,
+    "reminders": list,
+}
+
+def parse_briefing(json_string: str) -> Dict[str, Any]:
+    """Parses the model's JSON and checks it has the sections the template needs.
+
+    Only the top-level keys are inspected, so this adds no second walk over
+    the decoded tree.
+    """
+    data = json_loads(json_string)
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected a JSON object, got {type(data).__name__}")
+    missing = BRIEFING_SCHEMA.keys() - data.keys()
+    if missing:
+        raise ValueError(f"Briefing JSON is missing keys: {', '.join(sorted(missing))}")
+    for key, expected in BRIEFING_SCHEMA.items():
+        if not isinstance(data[key], expected):
+            raise ValueError(f"Briefing key '{key}' should be {expected.__name__}, got {type(data[key]).__name__}")
+    return data
+
 def get_market_briefing_data(prompt: str) -> Dict[str, Any]:
     logger.info("Requesting market briefing JSON via Chat Completions API…")
-    client = OpenAI(api_key=OPENAI_API_KEY)
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",  # Use a valid and available model, like gpt-4o or gpt-3.5-turbo
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that provides a market briefing."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"}
-        )
-        json_string = response.choices[0].message.content
-        return json.loads(json_string)
+        # Stream the completion so tokens are consumed as they are generated
+        # rather than buffered server-side until the whole answer is ready.
+        parts: List[str] = []
+        with _openai_client().chat.completions.create(**_completion_request(prompt), stream=True) as stream:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+        json_string = "".join(parts)
+        return parse_briefing(json_string)
     except Exception as e:
         logger.error(f"OpenAI API error: {e}")
         raise RuntimeError("Failed to fetch dynamic data.")
@@ -189,48 +340,311 @@ def get_market_briefing_data(prompt: str) -> Dict[str, Any]:
     
 #     return dummy_response
 
+# Bad credentials, rejected recipients and missing server features won't be
+# fixed by trying again.
+PERMANENT_SMTP_ERRORS = (
+    smtplib.SMTPAuthenticationError, smtplib.SMTPRecipientsRefused, smtplib.SMTPNotSupportedError,
+)
+
+def is_transient_smtp_error(e: BaseException) -> bool:
+    """True for failures that warrant dropping the connection and trying again.
+
+    That is any socket-level error (refused/reset connections, DNS, timeouts,
+    TLS) and any 4xx SMTP reply. 5xx replies and PERMANENT_SMTP_ERRORS are final.
+    """
+    if isinstance(e, PERMANENT_SMTP_ERRORS):
+        return False
+    if isinstance(e, smtplib.SMTPResponseException):
+        return 400 <= e.smtp_code < 500
+    # smtplib.SMTPException derives from OSError, so this also covers
+    # SMTPServerDisconnected.
+    return isinstance(e, OSError)
+
+_smtp_lock = threading.Lock()
+_smtp_server: Optional[smtplib.SMTP] = None
+
+def _resolve_ipv4(host: str, port: int) -> Optional[str]:
+    """Returns the first IPv4 address for host, or None if it can't be resolved."""
+    try:
+        return socket.getaddrinfo(host, port, socket.AF_INET, socket.SOCK_STREAM)[0][4][0]
+    except OSError as e:
+        logger.warning(f"Could not pre-resolve {host}: {e}. Falling back to per-connect lookup.")
+        return None
+
+# Resolved once per process and pinned to IPv4, so a connect never stalls on
+# an unreachable AAAA record before falling back.
+SMTP_IPV4 = _resolve_ipv4(SMTP_HOST, SMTP_PORT)
+
+SMTP_SNDBUF = 1 << 20
+
+class _PinnedSMTP(smtplib.SMTP):
+    """SMTP client that dials SMTP_IPV4 but keeps SMTP_HOST for TLS (SNI + cert check).
+
+    The socket also has Nagle disabled and a larger send buffer, so the
+    command/response exchange and the DATA phase aren't held back waiting
+    for ACKs. The options carry over when STARTTLS wraps the socket.
+    """
+
+    def _get_socket(self, host, port, timeout):
+        if SMTP_IPV4 is not None and host == SMTP_HOST:
+            host = SMTP_IPV4
+        sock = super()._get_socket(host, port, timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SMTP_SNDBUF)
+        return sock
+
+def _connect() -> smtplib.SMTP:
+    """Opens a new SMTP connection, upgrades it to TLS and logs in."""
+    server = _PinnedSMTP(SMTP_HOST, SMTP_PORT, timeout=30)
+    try:
+        server.starttls(context=ssl.create_default_context())
+        server.login(EMAIL_USER, GMAIL_APP_PASSWORD)
+    except Exception:
+        server.close()
+        raise
+    return server
+
+def _disconnect() -> None:
+    """Closes the shared SMTP connection, ignoring errors from a dead socket."""
+    global _smtp_server
+    if _smtp_server is None:
+        return
+    try:
+        _smtp_server.quit()
+    except (smtplib.SMTPException, OSError):
+        _smtp_server.close()
+    _smtp_server = None
+
+atexit.register(_disconnect)
+
+def _prepare_smtp() -> None:
+    """Establishes the shared SMTP connection ahead of the first send."""
+    global _smtp_server
+    with _smtp_lock:
+        if _smtp_server is not None:
+            return
+        try:
+            _smtp_server = _connect()
+        except OSError as e:
+            if not is_transient_smtp_error(e):
+                raise
+            # send_email() will reconnect with backoff, so don't fail the job here.
+            logger.warning(f"SMTP pre-connect failed: {e}")
+
+def submit_briefing_batch(prompt: str, custom_id: str) -> str:
+    """Uploads a one-request JSONL file and starts a batch. Returns the batch id."""
+    logger.info("Submitting market briefing request via Batch API…")
+    line = {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": _completion_request(prompt),
+    }
+    try:
+        batch_file = _openai_client().files.create(
+            file=("briefing.jsonl", json_dumps(line).encode("utf-8")),
+            purpose="batch",
+        )
+        batch = _openai_client().batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        return batch.id
+    except Exception as e:
+        logger.error(f"OpenAI API error: {e}")
+        raise RuntimeError("Failed to submit batch request.")
+
+class BatchFailedError(RuntimeError):
+    """The batch reached a final state without a usable briefing."""
+
+def fetch_batch_result(batch_id: str) -> Optional[Dict[str, Any]]:
+    """Returns the parsed briefing once the batch has completed, else None.
+
+    Raises BatchFailedError if the batch ended without a usable result; API
+    and connection errors propagate as-is so the batch can be polled again.
+    """
+    batch = _openai_client().batches.retrieve(batch_id)
+    if batch.status in ("validating", "in_progress", "finalizing", "cancelling"):
+        logger.info(f"Batch {batch_id} is still {batch.status}.")
+        return None
+    if batch.status != "completed" or not batch.output_file_id:
+        raise BatchFailedError(f"Batch {batch_id} ended with status {batch.status} and no output.")
+
+    output = _openai_client().files.content(batch.output_file_id).text
+    try:
+        result = json_loads(output.splitlines()[0])
+        json_string = result["response"]["body"]["choices"][0]["message"]["content"]
+        return parse_briefing(json_string)
+    except (ValueError, LookupError, TypeError) as e:
+        # The output file of a completed batch never changes, so don't poll it again.
+        raise BatchFailedError(f"Batch {batch_id} returned an unusable result: {e}") from e
+
+def _log_send_retry(retry_state: RetryCallState) -> None:
+    logger.warning(
+        f"Email send failed (attempt {retry_state.attempt_number}): {retry_state.outcome.exception()}. "
+        f"Reconnecting in {retry_state.next_action.sleep:.1f}s"
+    )
+
+# Jittered backoff so many schedulers firing at once don't retry in lockstep;
+# only transient errors are retried, everything else propagates immediately.
+@retry(
+    wait=wait_random_exponential(multiplier=1, max=30),
+    stop=stop_after_attempt(5),
+    retry=retry_if_exception(is_transient_smtp_error),
+    before_sleep=_log_send_retry,
+)
+def _do_send(msg: EmailMessage) -> None:
+    """Sends msg over the shared connection. Caller must hold _smtp_lock."""
+    global _smtp_server
+    try:
+        if _smtp_server is None:
+            _smtp_server = _connect()
+        _smtp_server.send_message(msg)
+    except PERMANENT_SMTP_ERRORS as e:
+        logger.error(f"Email send failed permanently: {e}")
+        _disconnect()
+        raise
+    except OSError:
+        _disconnect()
+        raise
+
 def send_email(subject: str, body: str) -> None:
-    """Sends an email using the configured SMTP server."""
-    msg = MIMEText(body, "html", "utf-8")
+    """Sends an email, reusing the logged-in SMTP connection when possible."""
+    msg = EmailMessage()
     msg["Subject"] = subject
     msg["From"] = EMAIL_USER
     msg["To"] = EMAIL_TO
+    msg.set_content("This briefing is best viewed in an HTML-capable mail client.")
+    msg.add_alternative(body, subtype="html")
 
-    for attempt in range(5):
+    with _smtp_lock:
         try:
-            with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30) as server:
-                server.starttls()
-                server.login(EMAIL_USER, GMAIL_APP_PASSWORD)
-                server.sendmail(EMAIL_USER, EMAIL_TO, msg.as_string())
-            logger.info("Email sent successfully.")
-            return
-        except Exception as e:
-            delay = 2 ** attempt  # Simple exponential backoff
-            logger.warning(f"Email send failed (attempt {attempt+1}): {e}. Retrying in {delay:.1f}s")
-            time.sleep(delay)
-    raise RuntimeError("Failed to send email after retries.")
+            _do_send(msg)
+        except RetryError as e:
+            raise RuntimeError("Failed to send email after retries.") from e.last_attempt.exception()
+    logger.info("Email sent successfully.")
+
+@functools.lru_cache(maxsize=4096)
+def to_currency(value: float) -> Markup:
+    """Jinja filter to format a number as currency.
+
+    The result only ever contains digits, "$", "," and ".", so it is returned
+    as Markup to let Jinja skip escaping it. Prices repeat across cells, so
+    formatted values are memoized.
+    """
+    return Markup(f"${value:,.2f}")
+
+# Build the Jinja2 environment and compile the template once per process.
+# Compilation already turns the static HTML into constant strings, so a render
+# is mostly joining those with the loop output; that is why the template stays
+# on Jinja rather than a hand-rolled renderer.
+# The bytecode cache lets restarts skip compilation too. Cached bytecode is
+# keyed on the template source only, so bump the tag in the file pattern
+# whenever the Environment options below change.
+JINJA_CACHE_DIR = ".jinja_cache"
+
+@functools.cache
+def _template() -> "Template":
+    from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, select_autoescape
+
+    os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+    env = Environment(
+        loader=FileSystemLoader('.'),
+        auto_reload=False,
+        bytecode_cache=FileSystemBytecodeCache(JINJA_CACHE_DIR, pattern="briefing-v2-%s.cache"),
+        optimized=True,
+        autoescape=select_autoescape(['html']),
+        trim_blocks=True,
+        lstrip_blocks=True,
+    )
+    env.filters['to_currency'] = to_currency
+    return env.get_template('email_template.html')
+
+def _send_briefing(data: Dict[str, Any], date_short: str) -> None:
+    """Renders the briefing data and emails it."""
+    # Build the HTML report using Jinja2
+    html_report = _template().render(data)
+
+    # Send the email
+    subject = f"📊 Daily Market Briefing – {date_short}"
+    send_email(subject, html_report)
 
-def to_currency(value: float) -> str:
-    """Jinja filter to format a number as currency."""
-    return f"${value:,.2f}"
+def _sentinel(day: date) -> Path:
+    return SENTINEL_DIR / f"daily-briefing-{day.isoformat()}.done"
 
 def daily_job() -> None:
     """Main function to perform the daily briefing task."""
     now_pht = datetime.now(PHT)
+    sentinel = _sentinel(now_pht.date())
+    if sentinel.exists():
+        logger.info("Briefing already sent today; nothing to do.")
+        return
+    date_long = now_pht.strftime(DATE_LONG_FMT)
+    date_short = now_pht.strftime(DATE_SHORT_FMT)
     
-    # 1. Generate prompt and get data
-    prompt = build_prompt(now_pht)
-    data = get_market_briefing_data(prompt)
+    # Generate prompt and get data, connecting to SMTP and loading the
+    # template while the quotes and the model are being fetched
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        smtp_ready = pool.submit(_prepare_smtp)
+        template_ready = pool.submit(_template)
+        prompt = build_prompt(date_long, fetch_quotes(QUOTE_TICKERS))
+        data = get_market_briefing_data(prompt)
+        smtp_ready.result()
+        template_ready.result()
     
-    # 2. Build the HTML report using Jinja2
-    env = Environment(loader=FileSystemLoader('.'))
-    env.filters['to_currency'] = to_currency
-    template = env.get_template('email_template.html')
-    html_report = template.render(data)
+    _send_briefing(data, date_short)
+    sentinel.touch()
 
-    # 3. Send the email
-    subject = f"📊 Daily Market Briefing – {now_pht.strftime('%B %d, %Y')}"
-    send_email(subject, html_report)
+def submit_job() -> None:
+    """Batch mode, step 1: submit today's request and remember the batch id."""
+    now_pht = datetime.now(PHT)
+    if _sentinel(now_pht.date()).exists():
+        logger.info("Briefing already sent today; nothing to do.")
+        return
+    if os.path.exists(BATCH_STATE_FILE):
+        with open(BATCH_STATE_FILE) as f:
+            pending = json_loads(f.read())
+        if datetime.fromisoformat(pending["submitted_at"]).date() == now_pht.date():
+            logger.info(f"Batch {pending['batch_id']} already submitted today; nothing to do.")
+            return
+        logger.warning(f"Replacing unfinished batch {pending['batch_id']} from {pending['submitted_at']}.")
+    prompt = build_prompt(now_pht.strftime(DATE_LONG_FMT), fetch_quotes(QUOTE_TICKERS))
+    batch_id = submit_briefing_batch(prompt, custom_id=f"daily-briefing-{now_pht.date().isoformat()}")
+
+    with open(BATCH_STATE_FILE, "w") as f:
+        f.write(json_dumps({"batch_id": batch_id, "submitted_at": now_pht.isoformat()}))
+    logger.info(f"Submitted batch {batch_id}.")
+
+def finalize_job() -> None:
+    """Batch mode, step 2: email the briefing once the pending batch completes.
+
+    Safe to run repeatedly (e.g. every 30 min from cron); it is a no-op until
+    the batch is done.
+    """
+    if not os.path.exists(BATCH_STATE_FILE):
+        logger.info("No pending batch.")
+        return
+    with open(BATCH_STATE_FILE) as f:
+        state = json_loads(f.read())
+
+    try:
+        data = fetch_batch_result(state["batch_id"])
+    except BatchFailedError:
+        os.remove(BATCH_STATE_FILE)
+        raise
+    if data is None:
+        return
+
+    submitted_at = datetime.fromisoformat(state["submitted_at"])
+    _send_briefing(data, submitted_at.strftime(DATE_SHORT_FMT))
+    _sentinel(submitted_at.date()).touch()
+    os.remove(BATCH_STATE_FILE)
 
 if __name__ == "__main__":
-    daily_job()
+    if not USE_BATCH:
+        daily_job()
+    elif sys.argv[1:] == ["finalize"]:
+        finalize_job()
+    else:
+        submit_job()